@@ -7,15 +7,19 @@ A robust Python framework for automated Telegram polling with vote collection
 
 import logging
 import asyncio
-from datetime import datetime, timedelta
-import pytz
-import threading
+import copy
+from datetime import datetime, timedelta, timezone
 import os
+import shelve
+import sys
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from telegram import Bot, Update
-from telegram.ext import Application, PollAnswerHandler
+from pymongo import DeleteOne, MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import AIORateLimiter, Application, PollAnswerHandler
 from enum import Enum
+from pathlib import Path
 
 # Load environment variables
 load_dotenv()
@@ -26,10 +30,53 @@ MONGODB_URI = os.environ.get('MONGODB_URI')
 TG_CHAT_ID = int(os.environ.get('TG_CHAT_ID', 0))
 DB_NAME = os.environ.get('DATABASE_NAME', 'Testing_TG_DB')
 
+# Cache of Telegram file_ids for uploaded local images
+FILE_ID_CACHE_PATH = os.environ.get('FILE_ID_CACHE_PATH', 'file_id_cache')
+
+UTC = timezone.utc
+
 # Poll Configuration
 POLL_DURATION_IN_MINS = int(os.environ.get('POLL_DURATION_IN_MINS', 60))
 POLL_OPTIONS = os.environ.get('POLL_OPTIONS', 'Option A,Option B').split(',')
 REMINDER_MINS = int(os.environ.get('REMINDER_MINS', 15))
+DEADLINE_CHECK_INTERVAL_SECS = 30
+
+# Vote batching
+VOTE_BATCH_SIZE = 50
+VOTE_FLUSH_INTERVAL_SECS = 5
+
+# Vote document fields, in the order values are built in receive_poll_answer
+_VOTE_FIELDS = (
+    '_id', 'user_id', 'selected_option', 'poll_id',
+    'poll_creation_date', 'vote_timestamp', 'username'
+)
+
+# Maximum concurrent Telegram delete requests during cleanup
+MAX_CONCURRENT_DELETES = 20
+
+# Telegram rate limits (requests per second overall, per minute per group)
+OVERALL_MAX_RATE = 30
+GROUP_MAX_RATE = 20
+MAX_RETRIES_ON_RETRY_AFTER = 3
+
+# Long polling: Telegram holds getUpdates open for up to this many seconds
+GET_UPDATES_TIMEOUT_SECS = 30
+
+# How often shutdown re-checks whether run_polling has finished starting the application
+APPLICATION_START_CHECK_INTERVAL_SECS = 0.1
+
+# Message templates
+REMINDER_TEMPLATE = (
+    "⏰ <b>Reminder!</b>\n\nPoll closes in {mins} minutes!\n"
+    "Make sure to cast your vote! 🗳️"
+)
+CONCLUSION_TEMPLATE = (
+    "📊 <b>Poll Results</b>\n\n"
+    "Total Votes: {total_votes}\n"
+    "{option_results}"
+    "\n<b>Result: {winning_option}</b>\n\n"
+)
+OPTION_RESULT_TEMPLATE = "{option_text}: {votes} votes ({percentage:.1f}%)\n"
 
 # Setup logging
 logging.basicConfig(
@@ -40,11 +87,26 @@ logger = logging.getLogger(__name__)
 logging.getLogger('httpx').setLevel(logging.WARNING)
 
 # MongoDB connection
+mongo_client = None
+
 if MONGODB_URI:
     mongo_client = MongoClient(MONGODB_URI)
     db = mongo_client[DB_NAME]
     db_votes = db.votes
     db_polls = db.polls
+    
+    # Indexes for per-poll vote lookups and recent poll queries
+    try:
+        db_votes.create_index([("poll_id", 1)])
+        db_votes.create_index([("user_id", 1), ("poll_id", 1)])
+        db_polls.create_index([("poll_creation_date", -1)])
+    except OperationFailure as e:
+        logger.warning("Failed to create database indexes: %s", e)
+    except PyMongoError as e:
+        logger.warning("Failed to connect to MongoDB: %s. Database features will be disabled.", e)
+        mongo_client.close()
+        mongo_client = None
+        db_votes = db_polls = None
 else:
     logger.warning("MongoDB URI not found. Database features will be disabled.")
     db_votes = db_polls = None
@@ -59,25 +121,34 @@ class PollStatus(Enum):
 class BotManager:
     """Manages all bot operations including polling and messaging"""
     
+    _POLL_PAYLOAD_TEMPLATE = {
+        "_id": None,
+        "message_ids": [],
+        "poll_creation_date": None,
+        "poll_message_id": None,
+        "total_votes": 0,
+        "option_votes": [],
+        "status": PollStatus.ACTIVE.value,
+        "poll_question": None,
+        "poll_options": [],
+        "poll_start_time": None,
+        "poll_end_time": None
+    }
+    
     def __init__(self):
         self.poll_payload = {}
         self.reset_poll_payload()
+        self._vote_buffer = []
+        self._vote_lock = asyncio.Lock()
+        self._vote_flush_task = None
+        self._workflow_task = None
+        self._seen_votes = {}
+        self._application = None
+        self.exit_code = 0
     
     def reset_poll_payload(self):
         """Reset poll payload to initial state"""
-        self.poll_payload = {
-            "_id": None,
-            "message_ids": [],
-            "poll_creation_date": None,
-            "poll_message_id": None,
-            "total_votes": 0,
-            "option_votes": [],
-            "status": PollStatus.ACTIVE.value,
-            "poll_question": None,
-            "poll_options": [],
-            "poll_start_time": None,
-            "poll_end_time": None
-        }
+        self.poll_payload = copy.deepcopy(self._POLL_PAYLOAD_TEMPLATE)
     
     def update_poll_data(self, poll_msg, current_time, poll_question):
         """Update poll payload with initial data"""
@@ -98,6 +169,34 @@ class BotManager:
         if message_id:
             self.poll_payload["message_ids"].append(message_id)
     
+    def _get_cached_file_id(self, image_path, mtime):
+        """Return the cached file_id for a local image if it has not been modified"""
+        try:
+            with shelve.open(FILE_ID_CACHE_PATH) as cache:
+                cached = cache.get(image_path)
+        except Exception as e:
+            logger.warning("Failed to read file_id cache: %s", e)
+            return None
+        if cached and cached["mtime"] == mtime:
+            return cached["file_id"]
+        return None
+    
+    def _cache_file_id(self, image_path, mtime, file_id):
+        """Store the Telegram file_id of an uploaded local image"""
+        try:
+            with shelve.open(FILE_ID_CACHE_PATH) as cache:
+                cache[image_path] = {"mtime": mtime, "file_id": file_id}
+        except Exception as e:
+            logger.warning("Failed to write file_id cache: %s", e)
+    
+    def _drop_cached_file_id(self, image_path):
+        """Remove a cached file_id that Telegram no longer accepts"""
+        try:
+            with shelve.open(FILE_ID_CACHE_PATH) as cache:
+                cache.pop(image_path, None)
+        except Exception as e:
+            logger.warning("Failed to update file_id cache: %s", e)
+    
     async def send_image(self, bot, chat_id, image_path=None, caption=""):
         """Send an image to the chat - can be a file path or URL"""
         try:
@@ -113,8 +212,27 @@ class BotManager:
                         protect_content=True,
                     )
                 else:
-                    # It's a local file
-                    with open(image_path, 'rb') as photo:
+                    # It's a local file - reuse the uploaded file_id while the image is unchanged
+                    # Disk access runs in a worker thread so votes keep being handled
+                    mtime = await asyncio.to_thread(os.path.getmtime, image_path)
+                    file_id = await asyncio.to_thread(self._get_cached_file_id, image_path, mtime)
+                    message = None
+                    if file_id:
+                        try:
+                            message = await bot.send_photo(
+                                chat_id=chat_id,
+                                photo=file_id,
+                                caption=caption,
+                                parse_mode="HTML",
+                                protect_content=True,
+                            )
+                        except TelegramError as e:
+                            # The file_id may be invalid (e.g. a different bot token) - upload again
+                            logger.warning("Cached file_id rejected, re-uploading image: %s", e)
+                            await asyncio.to_thread(self._drop_cached_file_id, image_path)
+                    
+                    if message is None:
+                        photo = await asyncio.to_thread(Path(image_path).read_bytes)
                         message = await bot.send_photo(
                             chat_id=chat_id,
                             photo=photo,
@@ -122,6 +240,9 @@ class BotManager:
                             parse_mode="HTML",
                             protect_content=True,
                         )
+                        await asyncio.to_thread(
+                            self._cache_file_id, image_path, mtime, message.photo[-1].file_id
+                        )
                 
                 logger.info("Sent image to Telegram")
                 return message
@@ -130,16 +251,16 @@ class BotManager:
                 return None
                 
         except Exception as e:
-            logger.error(f"Failed to send image: {e}")
+            logger.error("Failed to send image: %s", e)
             return None
     
     async def delete_message(self, bot, chat_id, message_id):
         """Delete a specific message"""
         try:
             await bot.delete_message(chat_id=chat_id, message_id=message_id)
-            logger.info(f"Deleted message {message_id}")
+            logger.info("Deleted message %s", message_id)
         except Exception as e:
-            logger.error(f"Failed to delete message {message_id}: {e}")
+            logger.error("Failed to delete message %s: %s", message_id, e)
 
     async def _send_poll(self, bot, chat_id, poll_question):
         """Send the poll message"""
@@ -161,34 +282,49 @@ class BotManager:
             return image_message
         return None
     
-    async def _run_poll_lifecycle(self, bot, chat_id):
+    async def _sleep_until(self, deadline):
+        """Sleep until an absolute event loop time, re-checking the clock to avoid drift"""
+        loop = asyncio.get_running_loop()
+        remaining = deadline - loop.time()
+        while remaining > 0:
+            await asyncio.sleep(min(remaining, DEADLINE_CHECK_INTERVAL_SECS))
+            remaining = deadline - loop.time()
+    
+    async def _run_poll_lifecycle(self, bot, chat_id, poll_started_at):
         """Handle the complete poll lifecycle"""
-        # Wait and send reminder
-        await asyncio.sleep((POLL_DURATION_IN_MINS - REMINDER_MINS) * 60)
-        reminder_message = await self._send_reminder(bot, chat_id)
+        # Deadlines are fixed once relative to when the poll was posted
+        reminder_at = poll_started_at + (POLL_DURATION_IN_MINS - REMINDER_MINS) * 60
+        end_at = poll_started_at + POLL_DURATION_IN_MINS * 60
+        
+        # Wait and send reminder (skipped when resuming a poll past its reminder time)
+        if asyncio.get_running_loop().time() < reminder_at:
+            await self._sleep_until(reminder_at)
+            reminder_message = await self._send_reminder(bot, chat_id)
+            self.add_message_id(reminder_message.message_id)
+            await self._save_poll()
         
         # Wait for poll to end
-        await asyncio.sleep(REMINDER_MINS * 60)
+        await self._sleep_until(end_at)
         
         # Close poll and process results
         closed_poll = await self._close_and_process_poll(bot, chat_id)
         
         # Clean up and save
-        await self._cleanup_and_save(bot, chat_id, reminder_message)
+        await self._cleanup_and_save(bot, chat_id)
         
         # Graceful shutdown
-        self._shutdown()
+        await self._shutdown()
     
     async def _send_reminder(self, bot, chat_id):
         """Send reminder message"""
-        reminder_text = f"⏰ <b>Reminder!</b>\n\nPoll closes in {REMINDER_MINS} minutes!\nMake sure to cast your vote! 🗳️"
+        reminder_text = REMINDER_TEMPLATE.format(mins=REMINDER_MINS)
         reminder_message = await bot.send_message(
             chat_id=chat_id,
             text=reminder_text,
             parse_mode="HTML",
             protect_content=True,
         )
-        logger.info(f"Sent {REMINDER_MINS}-minute reminder")
+        logger.info("Sent %s-minute reminder", REMINDER_MINS)
         return reminder_message
     
     async def _close_and_process_poll(self, bot, chat_id):
@@ -206,44 +342,71 @@ class BotManager:
         self.poll_payload.update({
             "total_votes": total_votes,
             "status": PollStatus.CLOSED.value,
-            "poll_end_time": datetime.now(pytz.timezone('UTC')).isoformat()
+            "poll_end_time": datetime.now(UTC).isoformat()
         })
         
-        winning_option = self._process_poll_results(closed_poll, total_votes)
+        recorded_votes = await self._count_recorded_votes(closed_poll.id)
+        winning_option = self._process_poll_results(closed_poll, total_votes, recorded_votes)
         
         # Send conclusion message
         await self._send_conclusion(bot, chat_id, total_votes, winning_option)
         
         return closed_poll
     
-    def _process_poll_results(self, closed_poll, total_votes):
+    async def _count_recorded_votes(self, poll_id):
+        """Tally stored votes per option index with a single server-side aggregation"""
+        if db_votes is None:
+            return None
+        
+        # Make sure buffered votes are counted
+        await self._flush_votes()
+        
+        pipeline = [
+            {"$match": {"poll_id": poll_id}},
+            {"$group": {"_id": "$selected_option", "votes": {"$sum": 1}}},
+        ]
+        try:
+            results = await asyncio.to_thread(lambda: list(db_votes.aggregate(pipeline)))
+            return {result["_id"]: result["votes"] for result in results}
+        except Exception as e:
+            logger.error("Failed to aggregate recorded votes: %s", e)
+            return None
+    
+    def _process_poll_results(self, closed_poll, total_votes, recorded_votes=None):
         """Process poll results and determine winner"""
         if total_votes > 0:
             options = closed_poll.options
             option_votes = []
-            max_votes = 0
+            winners = []
+            max_votes = -1
             
-            for option in options:
+            for index, option in enumerate(options):
                 vote_count = option.voter_count
                 percentage = (vote_count / total_votes) * 100
-                logger.info(f"Option '{option.text}': {vote_count} votes ({percentage:.1f}%)")
+                logger.info("Option '%s': %s votes (%.1f%%)", option.text, vote_count, percentage)
                 
-                option_votes.append({
+                option_vote = {
                     "option_text": option.text,
                     "votes": vote_count,
                     "percentage": percentage
-                })
+                }
+                if recorded_votes is not None:
+                    option_vote["recorded_votes"] = recorded_votes.get(index, 0)
+                option_votes.append(option_vote)
                 
-                max_votes = max(max_votes, vote_count)
+                # Track winner(s) in the same pass
+                if vote_count > max_votes:
+                    max_votes = vote_count
+                    winners = [option.text]
+                elif vote_count == max_votes:
+                    winners.append(option.text)
             
             self.poll_payload["option_votes"] = option_votes
             
-            # Determine winner(s)
-            winners = [opt for opt in option_votes if opt["votes"] == max_votes]
             if len(winners) > 1:
-                return "Tie between: " + ", ".join([w["option_text"] for w in winners])
+                return "Tie between: " + ", ".join(winners)
             else:
-                return winners[0]["option_text"]
+                return winners[0]
         else:
             logger.warning("No votes received")
             self.poll_payload["option_votes"] = []
@@ -251,15 +414,15 @@ class BotManager:
     
     async def _send_conclusion(self, bot, chat_id, total_votes, winning_option):
         """Send poll conclusion message"""
-        conclusion_text = (
-            "📊 <b>Poll Results</b>\n\n"
-            f"Total Votes: {total_votes}\n"
+        option_results = "".join(
+            OPTION_RESULT_TEMPLATE.format(**vote_data)
+            for vote_data in self.poll_payload["option_votes"]
+        )
+        conclusion_text = CONCLUSION_TEMPLATE.format(
+            total_votes=total_votes,
+            option_results=option_results,
+            winning_option=winning_option,
         )
-        
-        for vote_data in self.poll_payload["option_votes"]:
-            conclusion_text += f"{vote_data['option_text']}: {vote_data['votes']} votes ({vote_data['percentage']:.1f}%)\n"
-        
-        conclusion_text += f"\n<b>Result: {winning_option}</b>\n\n"
         
         await bot.send_message(
             chat_id=chat_id,
@@ -268,35 +431,129 @@ class BotManager:
             protect_content=True,
         )
     
-    async def _cleanup_and_save(self, bot, chat_id, reminder_message):
+    async def _flush_votes(self):
+        """Write buffered vote changes to the database in a single batch"""
+        async with self._vote_lock:
+            if not self._vote_buffer:
+                return
+            batch, self._vote_buffer = self._vote_buffer, []
+            try:
+                # Ordered so a re-vote or retraction is applied after the vote it replaces
+                await asyncio.to_thread(db_votes.bulk_write, batch, ordered=True)
+                logger.info("Saved %s votes to database", len(batch))
+            except BulkWriteError as e:
+                logger.warning(
+                    "Failed to save some of %s votes to database: %s",
+                    len(batch), e.details.get('writeErrors', [])
+                )
+            except Exception as e:
+                logger.error("Failed to save %s votes to database: %s", len(batch), e)
+    
+    def _start_vote_flushing(self):
+        """Start flushing buffered votes on a fixed interval"""
+        if db_votes is not None:
+            self._vote_flush_task = asyncio.create_task(self._flush_votes_periodically())
+    
+    async def _stop_vote_flushing(self):
+        """Stop periodic flushing and write any remaining buffered votes"""
+        if self._vote_flush_task:
+            self._vote_flush_task.cancel()
+            self._vote_flush_task = None
+        if db_votes is not None:
+            await self._flush_votes()
+    
+    async def _flush_votes_periodically(self):
+        """Flush residual buffered votes on a fixed interval"""
+        while True:
+            await asyncio.sleep(VOTE_FLUSH_INTERVAL_SECS)
+            await self._flush_votes()
+    
+    async def _cleanup_and_save(self, bot, chat_id):
         """Cleanup messages and save poll data"""
-        # Delete tracked messages (except poll and conclusion) - use set to avoid duplicates
-        unique_message_ids = set(self.poll_payload["message_ids"])
-        for message_id in unique_message_ids:
-            if message_id != self.poll_payload["poll_message_id"]:
+        # Delete tracked messages including the reminder (except poll and conclusion)
+        # Deletes are dispatched newest first but run concurrently,
+        # so completion order is not guaranteed
+        unique_message_ids = list(dict.fromkeys(self.poll_payload["message_ids"]))
+        message_ids = [
+            message_id for message_id in reversed(unique_message_ids)
+            if message_id != self.poll_payload["poll_message_id"]
+        ]
+        
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DELETES)
+        
+        async def delete_limited(message_id):
+            async with semaphore:
                 await self.delete_message(bot, chat_id, message_id)
         
-        # Delete reminder message
-        if reminder_message:
-            await self.delete_message(bot, chat_id, reminder_message.message_id)
+        await asyncio.gather(
+            *(delete_limited(message_id) for message_id in message_ids),
+            return_exceptions=True
+        )
+        
+        # Flush any votes still buffered
+        await self._stop_vote_flushing()
         
         # Save poll data to database
         if db_polls is not None:
-            db_polls.insert_one(self.poll_payload)
+            await self._save_poll()
             logger.info("Poll data saved to database")
     
-    def _shutdown(self):
-        """Graceful shutdown"""
-        logger.info("Poll workflow completed successfully")
-        asyncio.get_event_loop().stop()
-        os._exit(0)
+    async def _save_poll(self):
+        """Upsert the poll payload so an active poll can be resumed after a restart"""
+        if db_polls is not None:
+            await asyncio.to_thread(
+                db_polls.replace_one,
+                {"_id": self.poll_payload["_id"]},
+                self.poll_payload,
+                upsert=True,
+            )
+    
+    async def _shutdown(self, exit_code=0):
+        """Graceful shutdown - flush pending writes and stop polling cooperatively"""
+        if exit_code == 0:
+            logger.info("Poll workflow completed successfully")
+        self.exit_code = exit_code
+        await self._stop_vote_flushing()
+        
+        # Don't resume a poll whose workflow failed on the next run
+        poll_active = self.poll_payload["status"] == PollStatus.ACTIVE.value
+        if exit_code and self.poll_payload["_id"] and poll_active:
+            self.poll_payload["status"] = PollStatus.CANCELLED.value
+            try:
+                await self._save_poll()
+            except Exception as e:
+                logger.error("Failed to mark poll as cancelled: %s", e)
+        
+        # The workflow is scheduled from post_init, before run_polling starts the application,
+        # and stop_running() does nothing until it is running - so an early failure waits for it
+        while not self._application.running:
+            await asyncio.sleep(APPLICATION_START_CHECK_INTERVAL_SECS)
+        
+        # run_polling stops the updater and shuts down the application once this returns
+        self._application.stop_running()
+    
+    def start_workflow(self, workflow):
+        """Run the poll workflow as a task that stop() can cancel"""
+        self._workflow_task = asyncio.create_task(workflow)
+    
+    async def stop(self):
+        """Cancel an unfinished workflow and write any buffered votes"""
+        if self._workflow_task and not self._workflow_task.done():
+            self._workflow_task.cancel()
+            try:
+                await self._workflow_task
+            except asyncio.CancelledError:
+                pass
+        self._workflow_task = None
+        await self._stop_vote_flushing()
 
     async def post_poll(self, application, image_path=None, image_caption=""):
         """Main polling workflow"""
+        self._application = application
         try:
-            bot = Bot(TG_BOT_API_TOKEN)
+            bot = application.bot
             chat_id = TG_CHAT_ID
-            current_time = datetime.now(pytz.timezone('UTC'))
+            current_time = datetime.now(UTC)
             
             logger.info("=================== Starting Poll ===================")
             
@@ -305,27 +562,54 @@ class BotManager:
             
             # Send poll
             poll_msg = await self._send_poll(bot, chat_id, poll_question)
+            poll_started_at = asyncio.get_running_loop().time()
             
-            logger.info(f"Poll posted with ID: {poll_msg.poll.id}")
+            logger.info("Poll posted with ID: %s", poll_msg.poll.id)
             
             # Update poll payload
             self.poll_payload["_id"] = poll_msg.poll.id
             self.poll_payload["poll_message_id"] = poll_msg.message_id
             self.poll_payload["poll_creation_date"] = current_time.date().isoformat()
+            self.poll_payload["poll_start_time"] = current_time.isoformat()
             self.poll_payload["poll_question"] = poll_question
             self.poll_payload["poll_options"] = POLL_OPTIONS.copy()
             self.poll_payload["message_ids"].append(poll_msg.message_id)
             
+            # Start periodic vote flushing
+            self._start_vote_flushing()
+            
             # Send accompanying image if provided
             if image_path:
                 await self._send_image(bot, chat_id, image_path, image_caption)
             
+            # Persist the active poll so a restart can resume it
+            await self._save_poll()
+            
             # Handle the complete poll lifecycle
-            await self._run_poll_lifecycle(bot, chat_id)
+            await self._run_poll_lifecycle(bot, chat_id, poll_started_at)
+            
+        except Exception as e:
+            logger.error("Failed to execute poll workflow: %s", e, exc_info=True)
+            await self._shutdown(exit_code=1)
+
+    async def resume_poll(self, application, active_poll):
+        """Resume the lifecycle of a poll left active by a previous run"""
+        self._application = application
+        try:
+            self.poll_payload = active_poll
+            logger.info("Resuming poll with ID: %s", active_poll['_id'])
+            
+            # Rebase the wall-clock start time onto the event loop clock
+            poll_start_time = datetime.fromisoformat(active_poll["poll_start_time"])
+            elapsed = (datetime.now(UTC) - poll_start_time).total_seconds()
+            poll_started_at = asyncio.get_running_loop().time() - elapsed
+            
+            self._start_vote_flushing()
+            await self._run_poll_lifecycle(application.bot, TG_CHAT_ID, poll_started_at)
             
         except Exception as e:
-            logger.error(f"Failed to execute poll workflow: {e}", exc_info=True)
-            os._exit(1)
+            logger.error("Failed to resume poll workflow: %s", e, exc_info=True)
+            await self._shutdown(exit_code=1)
 
     async def receive_poll_answer(self, update: Update, context):
         """Handle incoming poll answers"""
@@ -333,34 +617,46 @@ class BotManager:
             poll_answer = update.poll_answer
             user_id = poll_answer.user.id
             username = poll_answer.user.username or "Unknown"
+            vote_key = (user_id, poll_answer.poll_id)
+            vote_id = f"{user_id}-{poll_answer.poll_id}"
+            
+            # Empty option_ids means the user retracted their vote
+            if not poll_answer.option_ids:
+                logger.info("User %s (%s) retracted their vote", username, user_id)
+                self._seen_votes.pop(vote_key, None)
+                # Always delete: a vote cast before a restart is in the database
+                # but not in _seen_votes
+                if db_votes is not None:
+                    self._vote_buffer.append(DeleteOne({'_id': vote_id}))
+                return
+            
             selected_option = poll_answer.option_ids[0]
             
-            logger.info(f"User {username} ({user_id}) voted: {POLL_OPTIONS[selected_option]}")
+            # Skip the database write if this vote is already recorded
+            if self._seen_votes.get(vote_key) == selected_option:
+                return
+            self._seen_votes[vote_key] = selected_option
+            
+            logger.info("User %s (%s) voted: %s", username, user_id, POLL_OPTIONS[selected_option])
             
             # Save vote to database
             if db_votes is not None:
-                vote_entry = {
-                    '_id': f"{user_id}-{poll_answer.poll_id}",
-                    'user_id': user_id,
-                    'selected_option': selected_option,
-                    'poll_id': poll_answer.poll_id,
-                    'poll_creation_date': self.poll_payload["poll_creation_date"],
-                    'vote_timestamp': datetime.now(pytz.timezone('UTC')).isoformat(),
-                    'username': username
-                }
+                vote_entry = dict(zip(_VOTE_FIELDS, (
+                    vote_id,
+                    user_id,
+                    selected_option,
+                    poll_answer.poll_id,
+                    self.poll_payload["poll_creation_date"],
+                    datetime.now(UTC).isoformat(),
+                    username,
+                )))
                 
-                db_votes.insert_one(vote_entry)
-                logger.info("Vote saved to database")
+                self._vote_buffer.append(ReplaceOne({'_id': vote_id}, vote_entry, upsert=True))
+                if len(self._vote_buffer) >= VOTE_BATCH_SIZE:
+                    await self._flush_votes()
         
         except Exception as e:
-            logger.error(f"Error processing poll answer: {e}", exc_info=True)
-
-
-def run_in_new_loop(coroutine):
-    """Run coroutine in a new event loop"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(coroutine)
+            logger.error("Error processing poll answer: %s", e, exc_info=True)
 
 
 def main():
@@ -375,32 +671,72 @@ def main():
     
     logger.info("Starting Telegram Polling Bot...")
     
-    # Create application
-    application = Application.builder().token(TG_BOT_API_TOKEN).build()
     bot_manager = BotManager()
     
-    # Add handlers
-    application.add_handler(PollAnswerHandler(bot_manager.receive_poll_answer))
-    
     # Get optional image settings from environment
     image_path = os.environ.get('DEFAULT_IMAGE_PATH')
     image_caption = os.environ.get('DEFAULT_IMAGE_CAPTION', '')
     enable_image = os.environ.get('ENABLE_IMAGE_SENDING', 'false').lower() == 'true'
     
-    # Start poll in separate thread
-    if enable_image and image_path:
-        threading.Thread(
-            target=run_in_new_loop, 
-            args=(bot_manager.post_poll(application, image_path, image_caption),)
-        ).start()
-    else:
-        threading.Thread(
-            target=run_in_new_loop, 
-            args=(bot_manager.post_poll(application),)
-        ).start()
+    # Resume a poll left active by a previous run instead of posting a new one
+    active_poll = None
+    if db_polls is not None:
+        try:
+            active_poll = db_polls.find_one(
+                {"status": PollStatus.ACTIVE.value},
+                sort=[("poll_start_time", -1)],
+            )
+        except PyMongoError as e:
+            logger.warning("Failed to look up active poll, starting a new one: %s", e)
+    
+    async def start_poll(application):
+        """Schedule the poll workflow on the application's event loop"""
+        # Not application.create_task: the application isn't running yet, so PTB won't await it
+        if active_poll:
+            bot_manager.start_workflow(bot_manager.resume_poll(application, active_poll))
+        elif enable_image and image_path:
+            bot_manager.start_workflow(
+                bot_manager.post_poll(application, image_path, image_caption)
+            )
+        else:
+            bot_manager.start_workflow(bot_manager.post_poll(application))
+    
+    async def stop_poll(application):
+        """Cancel the workflow and write buffered votes, including after SIGINT/SIGTERM"""
+        await bot_manager.stop()
+    
+    # Create application
+    rate_limiter = AIORateLimiter(
+        overall_max_rate=OVERALL_MAX_RATE,
+        group_max_rate=GROUP_MAX_RATE,
+        max_retries=MAX_RETRIES_ON_RETRY_AFTER,
+    )
+    application = (
+        Application.builder()
+        .token(TG_BOT_API_TOKEN)
+        .rate_limiter(rate_limiter)
+        .post_init(start_poll)
+        .post_stop(stop_poll)
+        .build()
+    )
+    
+    # Add handlers
+    application.add_handler(PollAnswerHandler(bot_manager.receive_poll_answer))
     
     # Start polling for updates
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    application.run_polling(
+        allowed_updates=[Update.POLL_ANSWER],
+        poll_interval=0.0,
+        timeout=GET_UPDATES_TIMEOUT_SECS,
+    )
+    
+    # Close database connections once polling has stopped
+    if mongo_client is not None:
+        mongo_client.close()
+        logger.info("Database connections closed")
+    
+    if bot_manager.exit_code:
+        sys.exit(bot_manager.exit_code)
 
 
 if __name__ == "__main__":
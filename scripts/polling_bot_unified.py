@@ -7,14 +7,18 @@ A robust Python framework for automated Telegram polling with vote collection
 
 import logging
 import asyncio
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, timezone
 import os
+import signal
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from telegram import Bot, Update
+from pymongo import AsyncMongoClient, DeleteOne, UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
+from telegram import Update
 from telegram.ext import Application, PollAnswerHandler
+from dataclasses import asdict, dataclass, field
 from enum import Enum
+from pathlib import Path
 
 # Custom Exceptions
 class BotConfigError(Exception):
@@ -34,11 +38,28 @@ MONGODB_URI = os.environ.get('MONGODB_URI')
 TG_CHAT_ID = int(os.environ.get('TG_CHAT_ID', 0))
 DB_NAME = os.environ.get('DATABASE_NAME', 'Testing_TG_DB')
 
+UTC = timezone.utc
+
 # Poll Configuration
 POLL_DURATION_IN_MINS = int(os.environ.get('POLL_DURATION_IN_MINS', 60))
-POLL_OPTIONS = os.environ.get('POLL_OPTIONS', 'Option A,Option B').split(',')
+POLL_OPTIONS = tuple(os.environ.get('POLL_OPTIONS', 'Option A,Option B').split(','))
 REMINDER_MINS = int(os.environ.get('REMINDER_MINS', 15))
 
+# Message templates
+REMINDER_TEXT = (
+    f"⏰ <b>Reminder!</b>\n\nPoll closes in {REMINDER_MINS} minutes!\n"
+    "Make sure to cast your vote! 🗳️"
+)
+
+# Telegram HTTP client
+POOL_TIMEOUT_SECS = 30
+CONNECT_TIMEOUT_SECS = 10
+READ_TIMEOUT_SECS = 30
+
+# Vote batching
+VOTE_BATCH_SIZE = 50
+VOTE_FLUSH_INTERVAL_SECS = 5
+
 # Setup logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -50,23 +71,40 @@ logging.getLogger('httpx').setLevel(logging.WARNING)
 # MongoDB connection
 mongo_client = None
 db_votes = None
+db_votes_fast = None
 db_polls = None
 
-if MONGODB_URI:
+
+async def connect_database():
+    """Connect to MongoDB - the async client binds to the running event loop"""
+    global mongo_client, db_votes, db_votes_fast, db_polls
+    
+    if not MONGODB_URI:
+        logger.warning("MongoDB URI not found. Database features will be disabled.")
+        return
+    
     try:
-        mongo_client = MongoClient(MONGODB_URI)
+        mongo_client = AsyncMongoClient(MONGODB_URI)
         # Test connection
-        mongo_client.admin.command('ping')
+        await mongo_client.admin.command('ping')
         db = mongo_client[DB_NAME]
         db_votes = db.votes
-        db_polls = db.polls
-        logger.info(f"Connected to MongoDB database: {DB_NAME}")
+        # Votes are fire-and-forget (closed poll totals are authoritative),
+        # poll results must be durable
+        db_votes_fast = db_votes.with_options(write_concern=WriteConcern(w=0))
+        db_polls = db.polls.with_options(write_concern=WriteConcern(w="majority"))
+        logger.info("Connected to MongoDB database: %s", DB_NAME)
     except Exception as e:
-        logger.warning(f"Failed to connect to MongoDB: {e}. Database features will be disabled.")
+        logger.warning("Failed to connect to MongoDB: %s. Database features will be disabled.", e)
         mongo_client = None
-        db_votes = db_polls = None
-else:
-    logger.warning("MongoDB URI not found. Database features will be disabled.")
+        db_votes = db_votes_fast = db_polls = None
+        return
+    
+    # One vote per user per poll
+    try:
+        await db_votes.create_index([("poll_id", 1), ("user_id", 1)], unique=True)
+    except OperationFailure as e:
+        logger.warning("Failed to create vote index: %s", e)
 
 
 class PollStatus(Enum):
@@ -75,41 +113,53 @@ class PollStatus(Enum):
     CLOSED = "closed"
     CANCELLED = "cancelled"
 
+@dataclass(slots=True)
+class PollPayload:
+    """Poll state tracked during the lifecycle and saved to the polls collection"""
+    id: str = None
+    message_ids: list = field(default_factory=list)
+    poll_creation_date: str = None
+    poll_message_id: int = None
+    total_votes: int = 0
+    option_votes: list = field(default_factory=list)
+    status: str = PollStatus.ACTIVE.value
+    poll_question: str = None
+    poll_options: list = field(default_factory=list)
+    poll_start_time: datetime = None
+    poll_end_time: datetime = None
+    
+    def to_document(self):
+        """Return the payload as a MongoDB document keyed by the Telegram poll ID"""
+        document = asdict(self)
+        return {"_id": document.pop("id"), **document}
+
 class BotManager:
     """Manages all bot operations including polling and messaging"""
     
     def __init__(self):
-        self.poll_payload = {
-            "_id": None,
-            "message_ids": [],
-            "poll_creation_date": None,
-            "poll_message_id": None,
-            "total_votes": 0,
-            "option_votes": [],
-            "status": PollStatus.ACTIVE.value,
-            "poll_question": None,
-            "poll_options": []
-        }
+        self.poll_payload = PollPayload()
         self.shutdown_event = asyncio.Event()  # Add shutdown coordination
+        self._vote_buffer = []
+        self._vote_lock = asyncio.Lock()
+        self._vote_flush_task = None
     
     def update_poll_data(self, poll_msg, current_time, poll_question):
         """Update poll payload with initial data"""
-        self.poll_payload.update({
-            "_id": poll_msg.poll.id,
-            "poll_message_id": poll_msg.message_id,
-            "poll_creation_date": current_time.date().isoformat(),
-            "poll_start_time": current_time.isoformat(),
-            "poll_question": poll_question,
-            "poll_options": POLL_OPTIONS.copy(),
-            "message_ids": [poll_msg.message_id],
-            "status": PollStatus.ACTIVE.value
-        })
-        return self.poll_payload
+        payload = self.poll_payload
+        payload.id = poll_msg.poll.id
+        payload.poll_message_id = poll_msg.message_id
+        payload.poll_creation_date = current_time.date().isoformat()
+        payload.poll_start_time = current_time
+        payload.poll_question = poll_question
+        payload.poll_options = list(POLL_OPTIONS)
+        payload.message_ids = []
+        payload.status = PollStatus.ACTIVE.value
+        return payload
 
     def add_message_id(self, message_id):
         """Add a message ID to tracking list"""
         if message_id:
-            self.poll_payload["message_ids"].append(message_id)
+            self.poll_payload.message_ids.append(message_id)
     
     async def send_image(self, bot, chat_id, image_path=None, caption=""):
         """Send an image to the chat - can be a file path or URL"""
@@ -125,14 +175,15 @@ class BotManager:
                         protect_content=True,
                     )
                 else:
-                    with open(image_path, 'rb') as photo:
-                        message = await bot.send_photo(
-                            chat_id=chat_id,
-                            photo=photo,
-                            caption=caption,
-                            parse_mode="HTML",
-                            protect_content=True,
-                        )
+                    # Read off the event loop so incoming votes aren't queued behind disk I/O
+                    photo = await asyncio.to_thread(Path(image_path).read_bytes)
+                    message = await bot.send_photo(
+                        chat_id=chat_id,
+                        photo=photo,
+                        caption=caption,
+                        parse_mode="HTML",
+                        protect_content=True,
+                    )
                 
                 logger.info("Sent image to Telegram")
                 return message
@@ -141,16 +192,16 @@ class BotManager:
                 return None
                 
         except Exception as e:
-            logger.error(f"Failed to send image: {e}")
+            logger.error("Failed to send image: %s", e)
             return None
     
     async def delete_message(self, bot, chat_id, message_id):
         """Delete a specific message"""
         try:
             await bot.delete_message(chat_id=chat_id, message_id=message_id)
-            logger.info(f"Deleted message {message_id}")
+            logger.info("Deleted message %s", message_id)
         except Exception as e:
-            logger.error(f"Failed to delete message {message_id}: {e}")
+            logger.error("Failed to delete message %s: %s", message_id, e)
 
     async def _send_poll(self, bot, chat_id, poll_question):
         """Send the poll message"""
@@ -172,15 +223,33 @@ class BotManager:
             return image_message
         return None
     
-    async def _run_poll_lifecycle(self, bot, chat_id, application):
+    async def _wait_until(self, deadline):
+        """Wait until an absolute event loop time. Returns True if shutdown was requested first"""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                self.shutdown_event.wait(),
+                timeout=max(0, deadline - loop.time())
+            )
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def _run_poll_lifecycle(self, bot, chat_id, application, poll_started_at):
         """Handle the complete poll lifecycle"""
+        # Deadlines are fixed once relative to when the poll was posted
+        reminder_deadline = poll_started_at + (POLL_DURATION_IN_MINS - REMINDER_MINS) * 60
+        close_deadline = poll_started_at + POLL_DURATION_IN_MINS * 60
+        
         try:
             # Wait and send reminder
-            await asyncio.sleep((POLL_DURATION_IN_MINS - REMINDER_MINS) * 60)
+            if await self._wait_until(reminder_deadline):
+                return
             reminder_message = await self._send_reminder(bot, chat_id)
             
             # Wait for poll to end
-            await asyncio.sleep(REMINDER_MINS * 60)
+            if await self._wait_until(close_deadline):
+                return
             
             # Close poll and process results
             closed_poll = await self._close_and_process_poll(bot, chat_id)
@@ -192,19 +261,18 @@ class BotManager:
             await self._shutdown(application)
             
         except Exception as e:
-            logger.error(f"Error in poll lifecycle: {e}")
+            logger.error("Error in poll lifecycle: %s", e)
             await self._shutdown(application)
     
     async def _send_reminder(self, bot, chat_id):
         """Send reminder message"""
-        reminder_text = f"⏰ <b>Reminder!</b>\n\nPoll closes in {REMINDER_MINS} minutes!\nMake sure to cast your vote! 🗳️"
         reminder_message = await bot.send_message(
             chat_id=chat_id,
-            text=reminder_text,
+            text=REMINDER_TEXT,
             parse_mode="HTML",
             protect_content=True,
         )
-        logger.info(f"Sent {REMINDER_MINS}-minute reminder")
+        logger.info("Sent %s-minute reminder", REMINDER_MINS)
         return reminder_message
     
     async def _close_and_process_poll(self, bot, chat_id):
@@ -212,18 +280,16 @@ class BotManager:
         # Close poll
         closed_poll = await bot.stop_poll(
             chat_id=chat_id,
-            message_id=self.poll_payload["poll_message_id"],
+            message_id=self.poll_payload.poll_message_id,
         )
         
         logger.info("Poll closed successfully")
         
         # Process results
         total_votes = closed_poll.total_voter_count
-        self.poll_payload.update({
-            "total_votes": total_votes,
-            "status": PollStatus.CLOSED.value,
-            "poll_end_time": datetime.now(pytz.timezone('UTC')).isoformat()
-        })
+        self.poll_payload.total_votes = total_votes
+        self.poll_payload.status = PollStatus.CLOSED.value
+        self.poll_payload.poll_end_time = datetime.now(UTC)
         
         winning_option = self._process_poll_results(closed_poll, total_votes)
         
@@ -237,12 +303,14 @@ class BotManager:
         if total_votes > 0:
             options = closed_poll.options
             option_votes = []
-            max_votes = 0
+            winners = []
+            max_votes = -1
+            percent_per_vote = 100.0 / total_votes
             
             for option in options:
                 vote_count = option.voter_count
-                percentage = (vote_count / total_votes) * 100
-                logger.info(f"Option '{option.text}': {vote_count} votes ({percentage:.1f}%)")
+                percentage = vote_count * percent_per_vote
+                logger.info("Option '%s': %s votes (%.1f%%)", option.text, vote_count, percentage)
                 
                 option_votes.append({
                     "option_text": option.text,
@@ -250,32 +318,36 @@ class BotManager:
                     "percentage": percentage
                 })
                 
-                max_votes = max(max_votes, vote_count)
+                # Track winner(s) in the same pass
+                if vote_count > max_votes:
+                    max_votes = vote_count
+                    winners = [option.text]
+                elif vote_count == max_votes:
+                    winners.append(option.text)
             
-            self.poll_payload["option_votes"] = option_votes
+            self.poll_payload.option_votes = option_votes
             
-            # Determine winner(s)
-            winners = [opt for opt in option_votes if opt["votes"] == max_votes]
             if len(winners) > 1:
-                return "Tie between: " + ", ".join([w["option_text"] for w in winners])
+                return "Tie between: " + ", ".join(winners)
             else:
-                return winners[0]["option_text"]
+                return winners[0]
         else:
             logger.warning("No votes received")
-            self.poll_payload["option_votes"] = []
+            self.poll_payload.option_votes = []
             return "No votes received"
     
     async def _send_conclusion(self, bot, chat_id, total_votes, winning_option):
         """Send poll conclusion message"""
-        conclusion_text = (
-            "<b>Poll Results</b> 📊\n\n"
-            f"Total Votes: {total_votes}\n"
-        )
-        
-        for vote_data in self.poll_payload["option_votes"]:
-            conclusion_text += f"{vote_data['option_text']}: {vote_data['votes']} votes ({vote_data['percentage']:.1f}%)\n"
-        
-        conclusion_text += f"\n<b>Result: {winning_option}</b>\n\n"
+        conclusion_text = "\n".join([
+            "<b>Poll Results</b> 📊\n",
+            f"Total Votes: {total_votes}",
+            *[
+                f"{vote_data['option_text']}: {vote_data['votes']} votes "
+                f"({vote_data['percentage']:.1f}%)"
+                for vote_data in self.poll_payload.option_votes
+            ],
+            f"\n<b>Result: {winning_option}</b>\n\n",
+        ])
         
         await bot.send_message(
             chat_id=chat_id,
@@ -284,20 +356,52 @@ class BotManager:
             protect_content=True,
         )
     
+    async def _flush_votes(self):
+        """Write buffered votes to the database in a single bulk write"""
+        async with self._vote_lock:
+            if not self._vote_buffer:
+                return
+            batch, self._vote_buffer = self._vote_buffer, []
+            try:
+                # Ordered so a retraction and a re-vote by the same user apply in sequence.
+                # Unacknowledged (w=0), so the server never reports per-write errors
+                await db_votes_fast.bulk_write(batch, ordered=True)
+                logger.info("Sent %s votes to database", len(batch))
+            except Exception as e:
+                logger.error("Failed to save %s votes to database: %s", len(batch), e)
+    
+    async def _flush_votes_loop(self):
+        """Flush residual buffered votes on a fixed interval until shutdown"""
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(VOTE_FLUSH_INTERVAL_SECS)
+            await self._flush_votes()
+    
+    async def _stop_vote_flushing(self):
+        """Stop periodic flushing and write any remaining buffered votes"""
+        if self._vote_flush_task:
+            self._vote_flush_task.cancel()
+            self._vote_flush_task = None
+        if db_votes is not None:
+            await self._flush_votes()
+    
     async def _cleanup_and_save(self, bot, chat_id, reminder_message):
         """Cleanup messages and save poll data"""
-        # Delete tracked messages (except poll and conclusion)
-        for message_id in self.poll_payload["message_ids"]:
-            if message_id != self.poll_payload["poll_message_id"]:
-                await self.delete_message(bot, chat_id, message_id)
+        # Flush buffered votes before the poll is saved
+        await self._stop_vote_flushing()
         
-        # Delete reminder message
+        # Delete tracked messages and the reminder concurrently - the poll is never tracked
+        message_ids = list(self.poll_payload.message_ids)
         if reminder_message:
-            await self.delete_message(bot, chat_id, reminder_message.message_id)
+            message_ids.append(reminder_message.message_id)
+        
+        await asyncio.gather(
+            *(self.delete_message(bot, chat_id, message_id) for message_id in message_ids),
+            return_exceptions=True
+        )
         
         # Save poll data to database
         if db_polls is not None:
-            db_polls.insert_one(self.poll_payload)
+            await db_polls.insert_one(self.poll_payload.to_document())
             logger.info("Poll data saved to database")
     
     async def _shutdown(self, application):
@@ -305,6 +409,9 @@ class BotManager:
         try:
             logger.info("Initiating graceful shutdown...")
             
+            # Write any votes still buffered before tasks are cancelled
+            await self._stop_vote_flushing()
+            
             # Signal shutdown event first to stop polling task
             self.shutdown_event.set()
             
@@ -327,75 +434,115 @@ class BotManager:
             
             # Close database connections
             if MONGODB_URI and 'mongo_client' in globals() and mongo_client:
-                mongo_client.close()
+                await mongo_client.close()
                 logger.info("Database connections closed")
             
         except Exception as e:
-            logger.error(f"Error during shutdown: {e}")
+            logger.error("Error during shutdown: %s", e)
         finally:
             logger.info("Shutdown completed")
 
     async def post_poll(self, application, image_path=None, image_caption=""):
         """Main polling workflow"""
         try:
-            bot = Bot(TG_BOT_API_TOKEN)
+            bot = application.bot
             chat_id = TG_CHAT_ID
-            current_time = datetime.now(pytz.timezone('UTC'))
+            current_time = datetime.now(UTC)
             
             logger.info("=================== Starting Poll ===================")
             
             # Create and send poll
             poll_question = f"Daily Poll - {current_time.strftime('%Y-%m-%d %H:%M')}"
             poll_msg = await self._send_poll(bot, chat_id, poll_question)
+            poll_started_at = asyncio.get_running_loop().time()
             
             # Update poll data
             self.update_poll_data(poll_msg, current_time, poll_question)
-            logger.info(f"Poll posted with ID: {poll_msg.poll.id}")
+            logger.info("Poll posted with ID: %s", poll_msg.poll.id)
+            
+            # Start periodic vote flushing
+            if db_votes is not None:
+                self._vote_flush_task = asyncio.create_task(self._flush_votes_loop())
             
             # Send optional image
             await self._send_image(bot, chat_id, image_path, image_caption)
             
             # Handle the complete poll lifecycle
-            await self._run_poll_lifecycle(bot, chat_id, application)
+            await self._run_poll_lifecycle(bot, chat_id, application, poll_started_at)
             
         except Exception as e:
-            logger.error(f"Failed to execute poll workflow: {e}", exc_info=True)
+            logger.error("Failed to execute poll workflow: %s", e, exc_info=True)
             await self._shutdown(application)
 
     async def receive_poll_answer(self, update: Update, context):
         """Handle incoming poll answers"""
         try:
             poll_answer = update.poll_answer
+            option_ids = poll_answer.option_ids
             user_id = poll_answer.user.id
             username = poll_answer.user.username or "Unknown"
-            selected_option = poll_answer.option_ids[0]
             
-            logger.info(f"User {username} ({user_id}) voted: {POLL_OPTIONS[selected_option]}")
+            vote_filter = {'poll_id': poll_answer.poll_id, 'user_id': user_id}
+            
+            # Empty option_ids means the user retracted their vote
+            if not option_ids:
+                logger.info("User %s (%s) retracted their vote", username, user_id)
+                if db_votes is not None:
+                    self._vote_buffer.append(DeleteOne(vote_filter))
+                return
+            
+            selected_option = option_ids[0]
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "User %s (%s) voted: %s", username, user_id, POLL_OPTIONS[selected_option]
+                )
             
             # Save vote to database
             if db_votes is not None:
                 vote_entry = {
-                    '_id': f"{user_id}-{poll_answer.poll_id}",
                     'user_id': user_id,
                     'selected_option': selected_option,
                     'poll_id': poll_answer.poll_id,
-                    'poll_creation_date': self.poll_payload["poll_creation_date"],
-                    'vote_timestamp': datetime.now(pytz.timezone('UTC')).isoformat(),
+                    'poll_creation_date': self.poll_payload.poll_creation_date,
+                    'vote_timestamp': datetime.now(UTC),
                     'username': username
                 }
                 
-                db_votes.insert_one(vote_entry)
-                logger.info("Vote saved to database")
+                # Upsert so a changed vote replaces the earlier one
+                self._vote_buffer.append(UpdateOne(vote_filter, {'$set': vote_entry}, upsert=True))
+                if len(self._vote_buffer) >= VOTE_BATCH_SIZE:
+                    await self._flush_votes()
         
         except Exception as e:
-            logger.error(f"Error processing poll answer: {e}", exc_info=True)
+            logger.error("Error processing poll answer: %s", e, exc_info=True)
 
 
 async def run_bot_async():
     """Async version of main bot logic"""
-    application = Application.builder().token(TG_BOT_API_TOKEN).build()
+    await connect_database()
+    
+    # HTTP/2 multiplexes concurrent sends/deletes over one connection
+    application = (
+        Application.builder()
+        .token(TG_BOT_API_TOKEN)
+        .http_version("2")
+        .pool_timeout(POOL_TIMEOUT_SECS)
+        .connect_timeout(CONNECT_TIMEOUT_SECS)
+        .read_timeout(READ_TIMEOUT_SECS)
+        .build()
+    )
     bot_manager = BotManager()
     
+    # Route SIGINT/SIGTERM through the shutdown event so cleanup runs on a live loop
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, bot_manager.shutdown_event.set)
+        except NotImplementedError:
+            # Not supported on Windows - KeyboardInterrupt in main() remains the fallback
+            pass
+    
     # Add handlers
     application.add_handler(PollAnswerHandler(bot_manager.receive_poll_answer))
     
@@ -417,7 +564,9 @@ async def run_bot_async():
         else:
             poll_task = asyncio.create_task(bot_manager.post_poll(application))
         
-        polling_task = asyncio.create_task(application.updater.start_polling())
+        polling_task = asyncio.create_task(
+            application.updater.start_polling(allowed_updates=[Update.POLL_ANSWER])
+        )
         
         # Wait for shutdown signal
         await bot_manager.shutdown_event.wait()
@@ -431,10 +580,13 @@ async def run_bot_async():
         try:
             await asyncio.gather(poll_task, polling_task, return_exceptions=True)
         except Exception as e:
-            logger.error(f"Error during task cancellation: {e}")
+            logger.error("Error during task cancellation: %s", e)
+        
+        # Write any votes still buffered when shutdown came from a signal
+        await bot_manager._stop_vote_flushing()
             
     except Exception as e:
-        logger.error(f"Error in main bot logic: {e}")
+        logger.error("Error in main bot logic: %s", e)
     finally:
         # Ensure proper cleanup even if there were errors
         try:
@@ -444,7 +596,10 @@ async def run_bot_async():
                 await application.stop()
             await application.shutdown()
         except Exception as e:
-            logger.error(f"Error during final cleanup: {e}")
+            logger.error("Error during final cleanup: %s", e)
+        
+        if mongo_client:
+            await mongo_client.close()
 
 
 def main():
@@ -464,18 +619,26 @@ def main():
         raise BotConfigError("Invalid poll duration configuration")
     
     logger.info("Starting Telegram Polling Bot...")
-    logger.info(f"Poll duration: {POLL_DURATION_IN_MINS} minutes")
-    logger.info(f"Reminder: {REMINDER_MINS} minutes before close")
-    logger.info(f"Poll options: {POLL_OPTIONS}")
+    logger.info("Poll duration: %s minutes", POLL_DURATION_IN_MINS)
+    logger.info("Reminder: %s minutes before close", REMINDER_MINS)
+    logger.info("Poll options: %s", POLL_OPTIONS)
+    
+    # Use the faster libuv-based event loop when available
+    try:
+        import uvloop
+        run = uvloop.run
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        run = asyncio.run
     
     try:
-        asyncio.run(run_bot_async())
+        run(run_bot_async())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except BotConfigError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
     except Exception as e:
-        logger.error(f"Bot crashed: {e}", exc_info=True)
+        logger.error("Bot crashed: %s", e, exc_info=True)
     finally:
         logger.info("Bot shutdown complete")
 
@@ -1,3 +1,4 @@
+import json
 import os
 import requests
 from dotenv import load_dotenv
@@ -6,6 +7,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TG_BOT_API_TOKEN = os.getenv('TG_BOT_API_TOKEN')
+# Telegram holds getUpdates open for up to LONG_POLL_TIMEOUT_SECS waiting for a message
+LONG_POLL_TIMEOUT_SECS = 30
+REQUEST_TIMEOUT_SECS = LONG_POLL_TIMEOUT_SECS + 5
 
 def main() -> None:
     """Get chat IDs from recent Telegram updates."""
@@ -13,10 +17,17 @@ def main() -> None:
         print("TG_BOT_API_TOKEN not found in environment variables.")
         return
     
-    # Get recent updates
-    response = requests.get(
-        f'https://api.telegram.org/bot{TG_BOT_API_TOKEN}/getUpdates'
-    )
+    # Get recent updates, waiting for the next one if none are pending
+    print(f"Waiting up to {LONG_POLL_TIMEOUT_SECS}s for a message to your bot...")
+    with requests.Session() as session:
+        response = session.get(
+            f'https://api.telegram.org/bot{TG_BOT_API_TOKEN}/getUpdates',
+            params={
+                'timeout': LONG_POLL_TIMEOUT_SECS,
+                'allowed_updates': json.dumps(['message', 'channel_post'])
+            },
+            timeout=REQUEST_TIMEOUT_SECS
+        )
     
     if response.status_code != 200:
         print(f"Error fetching updates: {response.status_code}")
@@ -24,32 +35,40 @@ def main() -> None:
     
     data = response.json()
     if not data['ok'] or not data['result']:
-        print("No recent updates found.")
-        print("Send a message to your bot first, then run this script.")
+        print(f"No message received within {LONG_POLL_TIMEOUT_SECS}s.")
+        print("Send a message to your bot, then re-run this script.")
         return
     
     # Process updates and show chat info
+    lines = []
     for update in data['result']:
         if 'message' in update:
             msg = update['message']
             chat = msg['chat']
             user = msg.get('from', {})
             
-            print(f"Chat ID: {chat['id']}")
-            print(f"Chat Type: {chat['type']}")
-            print(f"Chat Title: {chat.get('title', 'N/A')}")
-            print(f"From User: {user.get('first_name', '')} {user.get('last_name', '')}")
-            print(f"Username: @{user.get('username', 'N/A')}")
+            lines += [
+                f"Chat ID: {chat['id']}",
+                f"Chat Type: {chat['type']}",
+                f"Chat Title: {chat.get('title', 'N/A')}",
+                f"From User: {user.get('first_name', '')} {user.get('last_name', '')}",
+                f"Username: @{user.get('username', 'N/A')}",
+            ]
             
         elif 'channel_post' in update:
             post = update['channel_post']
             chat = post['chat']
             
-            print(f"Chat ID: {chat['id']}")
-            print(f"Chat Type: {chat['type']}")
-            print(f"Chat Title: {chat.get('title', 'N/A')}")
-            print(f"From User: Channel Post")
-            print(f"Username: @{chat.get('username', 'N/A')}")
+            lines += [
+                f"Chat ID: {chat['id']}",
+                f"Chat Type: {chat['type']}",
+                f"Chat Title: {chat.get('title', 'N/A')}",
+                "From User: Channel Post",
+                f"Username: @{chat.get('username', 'N/A')}",
+            ]
+    
+    if lines:
+        print("\n".join(lines))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file